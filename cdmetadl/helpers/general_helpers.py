@@ -3,14 +3,24 @@
 AS A PARTICIPANT, DO NOT MODIFY THIS CODE.
 """
 import os
+import copy
 import shutil
 import yaml
 import json
 import re
 import pandas as pd
 from sklearn.utils import check_random_state
-from glob import glob as ls
 from typing import List, Tuple
+try:
+    from yaml import CSafeLoader as _YamlLoader
+except ImportError:
+    from yaml import SafeLoader as _YamlLoader
+
+
+_NATURAL_SORT_RE = re.compile(r"(\d+)")
+
+# Parsed YAML files, indexed by path: ((modification time, size), content)
+_YAML_CACHE = dict()
 
 
 def vprint(message: str, 
@@ -76,9 +86,24 @@ def show_dir(dir: str = ".") -> None:
         dir (str, optional): Source directory to be listed. Defaults to '.'.
     """
     print(f"{'='*10} Listing directory {dir} {'='*10}")
-    print_list(ls(dir))
-    print_list(ls(dir + '/*'))
-    print_list(ls(dir + '/*/*'))
+    if not os.path.exists(dir):
+        return
+    
+    # Single traversal limited to two levels, hidden entries are skipped. Each
+    # level is gathered before printing to list it level by level
+    first_level, second_level = list(), list()
+    for root, dirs, files in os.walk(dir):
+        dirs[:] = [name for name in dirs if not name.startswith(".")]
+        paths = [os.path.join(root, name) for name in dirs + files 
+            if not name.startswith(".")]
+        if root == dir:
+            first_level.extend(paths)
+        else:
+            second_level.extend(paths)
+            dirs[:] = []
+    print(dir)
+    print_list(first_level)
+    print_list(second_level)
         
         
 def mvdir(source: str, 
@@ -102,7 +127,7 @@ def mvdir(source: str,
         
 def mkdir(dir: str) -> None:
     """ Create a directory. If the directory already exists, deletes it before 
-    creating it again.
+    creating it again, unless it is already empty.
 
     Args:
         dir (str): Directory to be created.
@@ -112,6 +137,10 @@ def mkdir(dir: str) -> None:
             created.
     """
     if os.path.exists(dir):
+        if os.path.isdir(dir):
+            with os.scandir(dir) as entries:
+                if next(entries, None) is None:
+                    return
         try:
             shutil.rmtree(dir)
         except:
@@ -124,7 +153,9 @@ def mkdir(dir: str) -> None:
         
         
 def load_yaml(file: str) -> dict:
-    """ Loads the content of a YAML file.
+    """ Loads the content of a YAML file. The parsed content is cached and 
+    only parsed again when the modification time or the size of the file 
+    changes.
 
     Args:
         file (str): File in YAML format.
@@ -136,7 +167,15 @@ def load_yaml(file: str) -> dict:
         dict: Content of the YAML file.
     """
     try:
-        return yaml.safe_load(open(file, "r"))
+        stat = os.stat(file)
+        version = (stat.st_mtime_ns, stat.st_size)
+        cached = _YAML_CACHE.get(file)
+        if cached is None or cached[0] != version:
+            # Read as bytes, the YAML reader detects the encoding itself
+            with open(file, "rb") as f:
+                cached = (version, yaml.load(f, Loader=_YamlLoader))
+            _YAML_CACHE[file] = cached
+        return copy.deepcopy(cached[1])
     except:
         raise OSError(f"In load_yaml, file '{file}' could not be opened or "
             + f"has wrong format")
@@ -323,6 +362,6 @@ def natural_sort(text: str) -> list:
     Returns:
         list: Splitted text into words and digits.
     """
-    atoi = lambda x: int(x) if x.isdigit() else x
-    return [atoi(c) for c in re.split(r"(\d+)", text)]       
+    return [int(c) if c.isdigit() else c for c in 
+        _NATURAL_SORT_RE.split(text)]       
         
\ No newline at end of file
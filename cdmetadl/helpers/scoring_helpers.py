@@ -3,17 +3,29 @@
 AS A PARTICIPANT, DO NOT MODIFY THIS CODE.
 """
 import base64
+import functools
+import io
+import math
 import numpy as np
 import pandas as pd
 import scipy.stats as st
 import seaborn as sns
 import matplotlib.pyplot as plt
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.figure import Figure, SubplotParams
 from sys import modules
-from sklearn.metrics import accuracy_score, f1_score, precision_score, \
-    recall_score
 from typing import Tuple, Callable
+try:
+    import numba
+except ImportError:
+    numba = None
 
 
+# Figure reused by all the plots. It is drawn with the Agg canvas directly, 
+# without going through pyplot, so the active backend is left untouched
+_FIGURE = Figure(figsize=(8,4))
+FigureCanvasAgg(_FIGURE)
+
 # =============================================================================
 # ========================= SCORE RELATED HELPERS =============================
 # =============================================================================
@@ -30,6 +42,21 @@ def read_results_file(file: str) -> np.ndarray:
     Returns:
         np.ndarray: Array of data of the results file.
     """
+    try:
+        # Parse once with the C tokenizer of pandas
+        results = pd.read_csv(file, header=None, sep=r"\s+", 
+            engine="c").to_numpy()
+        # Ragged (NaN padded) and single row files are left to NumPy, which 
+        # rejects or reshapes them as before
+        if not pd.isna(results).any() and results.shape[0] > 1:
+            if results.shape[1] > 1:
+                return results.astype(float)
+            if results.dtype.kind in "iu":
+                return results[:, 0]
+    except:
+        pass
+    
+    # Fall back to NumPy for the files pandas cannot handle
     try:
         results = np.loadtxt(file, dtype=float)
         if len(results.shape) == 2:
@@ -41,9 +68,12 @@ def read_results_file(file: str) -> np.ndarray:
             + f"opened")
     
 
+@functools.lru_cache(maxsize=1)
 def get_score(score_file_path: str) -> Tuple[str, 
         Callable[[np.ndarray, np.ndarray], float]]:
-    """ Read the score that should be used to evaluate the submissions.
+    """ Read the score that should be used to evaluate the submissions. The 
+    result is cached, so repeated calls with the same path do not read the
+    scores file again.
 
     Args:
         score_file_path (str): Path to the scores file.
@@ -72,6 +102,23 @@ def get_score(score_file_path: str) -> Tuple[str,
     return score_name, scoring_function
         
 
+@functools.lru_cache(maxsize=512)
+def _t_ppf(n: int, 
+           q: float) -> float:
+    """ Compute the quantile of the Student's t distribution used for the 
+    confidence interval of n samples. The result is cached since the same 
+    number of samples and confidence level are used repeatedly.
+
+    Args:
+        n (int): Number of samples.
+        q (float): Probability of the quantile.
+
+    Returns:
+        float: Quantile of the t distribution with n-1 degrees of freedom.
+    """
+    return float(st.t.ppf(q, n-1))
+
+
 def mean_confidence_interval(data: list, 
                              confidence: float = 0.95) -> Tuple[float, float]:
     """ Compute the mean and the confidence interval of the specified data. The
@@ -90,19 +137,53 @@ def mean_confidence_interval(data: list,
     if n == 0:
         return None, None
     if n > 1:
-        mean = np.mean(data)
-        scale = st.sem(data)
+        if n < 64:
+            # Scalar arithmetic is cheaper than NumPy for a few values
+            mean = math.fsum(data) / n
+            var = math.fsum((x - mean) ** 2 for x in data) / (n - 1)
+            scale = math.sqrt(var / n)
+        else:
+            mean = np.mean(data)
+            scale = np.std(data, ddof=1) / np.sqrt(n)
         if scale < 1e-15:
             scale = 1e-15
-        lb, _ = st.t.interval(alpha=confidence, df=len(data)-1, loc=mean, 
-            scale=scale)
-        conf_int = mean - lb 
+        conf_int = scale * _t_ppf(n, (1 + confidence) / 2)
     else:
         mean = data[0]
         conf_int = 0.0
     return mean, conf_int
 
 
+def _reset_figure() -> Figure:
+    """ Clear the shared figure so it can be used for a new plot.
+
+    Returns:
+        Figure: Empty figure.
+    """
+    _FIGURE.clear()
+    _FIGURE.subplotpars = SubplotParams()
+    return _FIGURE
+
+
+def _save_figure(fig: Figure, 
+                 path: str) -> str:
+    """ Render a figure as PNG in memory, save it and encode it in base64.
+
+    Args:
+        fig (Figure): Figure to be saved.
+        path (str): Path to save the figure, without the extension.
+
+    Returns:
+        str: Figure encoded in base64.
+    """
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png", dpi=fig.dpi)
+    raw = buffer.getvalue()
+    with open(f"{path}.png", "wb") as image_file:
+        image_file.write(raw)
+    return base64.b64encode(raw).decode('ascii')
+
+
 def create_histogram(data: list, 
                      score_name: str, 
                      title: str, 
@@ -120,20 +201,30 @@ def create_histogram(data: list,
     """
     sns.set_style('darkgrid')
     
-    df = pd.DataFrame(data, columns=["value"])
-    
-    fig, ax = plt.subplots(figsize=(8,4))
+    values = np.asarray(data)
+    x_min, x_max = np.min(values), np.max(values)
+    fig = _reset_figure()
+    ax = fig.add_subplot()
     
-    # KDE plot
+    # KDE plot, skipped for large data since it is far slower than the 
+    # histogram and for singular data since the density is not defined
     sns.set_style('white')
-    sns.kdeplot(data=df, x="value", ax=ax, warn_singular=False)
+    if len(values) <= 50_000 and not np.isclose(x_min, x_max):
+        try:
+            grid = np.linspace(x_min, x_max, 256)
+            ax.plot(grid, st.gaussian_kde(values)(grid))
+        except np.linalg.LinAlgError:
+            pass
+    ax.set_ylim(bottom=0)
+    ax.set_ylabel("Density")
     
     # Histogram plot
     ax2 = ax.twinx()
-    sns.histplot(data=df, x="value",  bins=40, ax=ax2)
+    counts, edges = np.histogram(values, bins=40)
+    ax2.bar((edges[:-1] + edges[1:]) / 2, counts, width=np.diff(edges), 
+        alpha=0.75, edgecolor="white")
 
     # Format axes
-    x_min, x_max = np.min(data), np.max(data)
     if not np.isclose(x_min, x_max):
         ax.set_xlim((x_min, x_max))
     ax.set_xlabel(f"Score ({score_name})") 
@@ -141,11 +232,7 @@ def create_histogram(data: list,
     ax.set_title(title, size = 17)
     
     # Save and return plot
-    fig.savefig(path, dpi=fig.dpi)
-    plt.close(fig)
-    with open(f"{path}.png", "rb") as image_file:
-        histogram = base64.b64encode(image_file.read()).decode('ascii')
-    return histogram
+    return _save_figure(fig, path)
 
 
 def create_heatmap(data: dict, 
@@ -168,20 +255,21 @@ def create_heatmap(data: dict,
         str: Frequency heatmap.
     """
     # Limits for the heatmap
-    minimum = np.inf
-    maximum = -np.inf
-    for key in keys:
-        minimum = min(np.min(data[key][score_name]), minimum)
-        maximum = max(np.max(data[key][score_name]), maximum)    
+    arrays = [np.asarray(data[key][score_name]) for key in keys]
+    values = np.concatenate(arrays)
+    bins = np.linspace(values.min(), values.max(), 11)
     
-    # Heatmap data
-    bins = np.linspace(minimum, maximum, 11)
-    heatmap = [np.histogram(data[key][score_name], bins=bins)[0] for key in 
-        keys]
+    # Heatmap data, the last bin includes its right edge as in np.histogram
+    num_bins = len(bins) - 1
+    heatmap = np.stack([np.bincount(np.clip(np.searchsorted(bins, array, 
+        side="right") - 1, 0, num_bins - 1), minlength=num_bins) 
+        for array in arrays])
       
     # Plot
-    fig, ax = plt.subplots(figsize=(8,4))
-    sns.heatmap(heatmap, cmap="Blues", linewidths=.2, yticklabels=yticks)
+    fig = _reset_figure()
+    ax = fig.add_subplot()
+    sns.heatmap(heatmap, cmap="Blues", linewidths=.2, yticklabels=yticks, 
+        ax=ax)
     ax.set_xticks(np.arange(len(bins)), labels=np.round(bins, 2))
     plt.setp(ax.get_xticklabels(), rotation=45, ha="right", 
         rotation_mode="anchor")
@@ -190,16 +278,226 @@ def create_heatmap(data: dict,
     fig.tight_layout()
     
     # Save and return plot
-    fig.savefig(path, dpi=fig.dpi)
-    plt.close(fig)
-    with open(f"{path}.png", "rb") as image_file:
-        heatmap = base64.b64encode(image_file.read()).decode('ascii')
-    return heatmap
+    return _save_figure(fig, path)
 
 # =============================================================================
 # ============================== SCORE FUNCTIONS ==============================
 # =============================================================================
 
+def _check_lengths(y_true: np.ndarray, 
+                   y_pred: np.ndarray) -> None:
+    """ Check that there is one prediction per ground truth label, since 
+    NumPy would otherwise broadcast mismatched arrays silently, and that there
+    is at least one of them.
+
+    Args:
+        y_true (np.ndarray): Ground truth labels.
+        y_pred (np.ndarray): Predicted labels or predicted probabilities.
+
+    Raises:
+        ValueError: Error raised when the ground truth and the predictions have
+            different lengths or are empty.
+    """
+    if len(y_true) == 0:
+        raise ValueError("Found no ground truth labels")
+    if len(y_true) != len(y_pred):
+        raise ValueError(f"Found {len(y_true)} ground truth labels and "
+            + f"{len(y_pred)} predictions")
+
+
+def _confusion_matrix(y_true: np.ndarray, 
+                      y_pred_labels: np.ndarray) -> np.ndarray:
+    """ Build the confusion matrix of the given labels in a single pass. As in 
+    sklearn, only the labels present in the ground truth or in the predictions
+    are considered, whatever their values.
+
+    Args:
+        y_true (np.ndarray): Ground truth labels.
+        y_pred_labels (np.ndarray): Predicted labels.
+
+    Raises:
+        ValueError: Error raised when the ground truth and the predictions have
+            different lengths or are empty.
+
+    Returns:
+        np.ndarray: Confusion matrix where rows correspond to the ground truth
+            labels and columns to the predicted labels.
+    """
+    y_true = np.asarray(y_true).ravel()
+    y_pred_labels = np.asarray(y_pred_labels).ravel()
+    _check_lengths(y_true, y_pred_labels)
+    
+    # Map the labels to 0..K-1
+    labels, inverse = np.unique(np.concatenate([y_true, y_pred_labels]), 
+        return_inverse=True)
+    inverse = inverse.ravel()
+    num_classes = len(labels)
+    matrix = np.zeros((num_classes, num_classes), dtype=np.int64)
+    np.add.at(matrix, (inverse[:len(y_true)], inverse[len(y_true):]), 1)
+    return matrix
+
+
+def _predicted_labels(y_pred: np.ndarray) -> np.ndarray:
+    """ Convert the predictions into labels. Predicted probabilities are
+    reduced with argmax, predicted labels are returned as they are.
+
+    Args:
+        y_pred (np.ndarray): Predicted labels or predicted probabilities.
+
+    Returns:
+        np.ndarray: Predicted labels.
+    """
+    if len(y_pred.shape) == 2:
+        return np.argmax(y_pred, axis=1)
+    return y_pred
+
+
+def _accuracy_from_labels(y_true: np.ndarray, 
+                          y_pred_labels: np.ndarray) -> float:
+    """ Compute the accuracy of the given predicted labels.
+
+    Args:
+        y_true (np.ndarray): Ground truth labels.
+        y_pred_labels (np.ndarray): Predicted labels.
+
+    Raises:
+        ValueError: Error raised when the ground truth and the predictions have
+            different lengths or are empty.
+
+    Returns:
+        float: Accuracy of the predicted labels.
+    """
+    y_true = np.asarray(y_true).ravel()
+    y_pred_labels = np.asarray(y_pred_labels).ravel()
+    _check_lengths(y_true, y_pred_labels)
+    return float(np.mean(y_pred_labels == y_true))
+
+
+if numba is not None:
+    @numba.njit(parallel=True, cache=True)
+    def _count_correct(y_true: np.ndarray, 
+                       y_pred: np.ndarray) -> int:
+        """ Count the correct predictions by computing the argmax of each row 
+        of the predicted probabilities and comparing it to the ground truth in
+        the same pass. Ties and NaN values are resolved as in np.argmax.
+
+        Args:
+            y_true (np.ndarray): Ground truth labels.
+            y_pred (np.ndarray): Predicted probabilities.
+
+        Returns:
+            int: Number of correct predictions.
+        """
+        n, k = y_pred.shape
+        correct = 0
+        for i in numba.prange(n):
+            best = y_pred[i, 0]
+            label = 0
+            if best == best:
+                for j in range(1, k):
+                    value = y_pred[i, j]
+                    if value > best:
+                        best = value
+                        label = j
+                    elif value != value:
+                        label = j
+                        break
+            correct += label == y_true[i]
+        return correct
+
+
+def _scores_from_confusion_matrix(matrix: np.ndarray) -> Tuple[float, float,
+                                                               float, float]:
+    """ Compute the accuracy, macro averaged precision, macro averaged recall 
+    and macro averaged f1 score from a confusion matrix. As in sklearn, 
+    undefined ratios are set to 0.
+
+    Args:
+        matrix (np.ndarray): Confusion matrix.
+
+    Returns:
+        Tuple[float, float, float, float]: Accuracy, macro averaged precision,
+            macro averaged recall and macro averaged f1 score.
+    """
+    tp = np.diag(matrix)
+    col = matrix.sum(axis=0)
+    row = matrix.sum(axis=1)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        prec = np.where(col > 0, tp / col, 0.0)
+        rec = np.where(row > 0, tp / row, 0.0)
+        f1 = np.where(prec + rec > 0, 2 * prec * rec / (prec + rec), 0.0)
+    
+    acc = tp.sum() / matrix.sum()
+    return (float(acc), float(prec.mean()), float(rec.mean()), 
+        float(f1.mean()))
+
+
+def _scores_from_confusion_matrix_loop(matrix: np.ndarray) -> Tuple[float, 
+        float, float, float]:
+    """ Same as _scores_from_confusion_matrix, written as a single loop over 
+    the classes so it can be compiled with numba.
+
+    Args:
+        matrix (np.ndarray): Confusion matrix.
+
+    Returns:
+        Tuple[float, float, float, float]: Accuracy, macro averaged precision,
+            macro averaged recall and macro averaged f1 score.
+    """
+    num_classes = matrix.shape[0]
+    tp = 0
+    total = 0
+    macro_prec = 0.0
+    macro_rec = 0.0
+    macro_f1 = 0.0
+    for i in range(num_classes):
+        row = 0
+        col = 0
+        for j in range(num_classes):
+            row += matrix[i, j]
+            col += matrix[j, i]
+        diag = matrix[i, i]
+        tp += diag
+        total += row
+        prec = diag / col if col > 0 else 0.0
+        rec = diag / row if row > 0 else 0.0
+        f1 = 2 * prec * rec / (prec + rec) if prec + rec > 0 else 0.0
+        macro_prec += prec
+        macro_rec += rec
+        macro_f1 += f1
+    return (tp / total, macro_prec / num_classes, macro_rec / num_classes, 
+        macro_f1 / num_classes)
+
+
+if numba is not None:
+    _scores_from_confusion_matrix = numba.njit(cache=True)(
+        _scores_from_confusion_matrix_loop)
+
+
+def _scores_from_labels(y_true: np.ndarray, 
+                        y_pred_labels: np.ndarray) -> Tuple[float, float, 
+                                                            float, float]:
+    """ Compute the accuracy, macro averaged precision, macro averaged recall 
+    and macro averaged f1 score of the given predicted labels from a single 
+    confusion matrix.
+
+    Args:
+        y_true (np.ndarray): Ground truth labels.
+        y_pred_labels (np.ndarray): Predicted labels.
+
+    Raises:
+        ValueError: Error raised when the ground truth and the predictions have
+            different lengths or are empty.
+
+    Returns:
+        Tuple[float, float, float, float]: Accuracy, macro averaged precision,
+            macro averaged recall and macro averaged f1 score.
+    """
+    matrix = _confusion_matrix(y_true, y_pred_labels)
+    acc, prec, rec, f1 = _scores_from_confusion_matrix(matrix)
+    return float(acc), float(prec), float(rec), float(f1)
+
+
 def normalized_accuracy(y_true: np.ndarray, 
                         y_pred: np.ndarray,
                         num_ways: int) -> float:
@@ -218,10 +516,9 @@ def normalized_accuracy(y_true: np.ndarray,
     Returns:
         float: Normalized accuracy of the predictions.
     """
-    if len(y_pred.shape) == 2:
-        y_pred = np.argmax(y_pred, axis=1)
     try:
-        bac = recall_score(y_true, y_pred, average = "macro", zero_division=0)
+        _, _, bac, _ = _scores_from_labels(y_true, 
+            _predicted_labels(y_pred))
         base_bac = 1/num_ways # random guessing
         return (bac - base_bac) / (1 - base_bac)
     except Exception as e:
@@ -243,10 +540,14 @@ def accuracy(y_true: np.ndarray,
     Returns:
         float: Accuracy of the predictions.
     """
-    if len(y_pred.shape) == 2:
-        y_pred = np.argmax(y_pred, axis=1)
     try:
-        return accuracy_score(y_true, y_pred)
+        y_true = np.asarray(y_true).ravel()
+        _check_lengths(y_true, y_pred)
+        if len(y_pred.shape) == 2:
+            if numba is not None and y_pred.dtype.kind == "f":
+                return _count_correct(y_true, y_pred) / len(y_pred)
+            return float(np.mean(np.argmax(y_pred, axis=1) == y_true))
+        return _accuracy_from_labels(y_true, y_pred)
     except Exception as e:
         raise Exception(f"In accuracy, score cannot be computed. Detailed "
             + f"error: {repr(e)}")
@@ -267,10 +568,10 @@ def macro_f1_score(y_true: np.ndarray,
     Returns:
         float: Macro averaged f1 score of the predictions.
     """
-    if len(y_pred.shape) == 2:
-        y_pred = np.argmax(y_pred, axis=1)
     try:
-        return f1_score(y_true, y_pred, average = "macro", zero_division = 0)
+        _, _, _, f1 = _scores_from_labels(y_true, 
+            _predicted_labels(y_pred))
+        return f1
     except Exception as e:
         raise Exception(f"In macro_f1_score, score cannot be computed. "
             + f"Detailed error: {repr(e)}")
@@ -291,11 +592,10 @@ def macro_precision(y_true: np.ndarray,
     Returns:
         float: Macro averaged precision of the predictions.
     """
-    if len(y_pred.shape) == 2:
-        y_pred = np.argmax(y_pred, axis=1)
     try:
-        return precision_score(y_true, y_pred, average = "macro", 
-            zero_division = 0)
+        _, prec, _, _ = _scores_from_labels(y_true, 
+            _predicted_labels(y_pred))
+        return prec
     except Exception as e:
         raise Exception(f"In macro_precision, score cannot be computed. "
             + f"Detailed error: {repr(e)}")
@@ -316,16 +616,20 @@ def macro_recall(y_true: np.ndarray,
     Returns:
         float: Macro averaged recall of the predictions.
     """
-    if len(y_pred.shape) == 2:
-        y_pred = np.argmax(y_pred, axis=1)
     try:
-        return recall_score(y_true, y_pred, average = "macro", 
-            zero_division = 0)
+        _, _, rec, _ = _scores_from_labels(y_true, 
+            _predicted_labels(y_pred))
+        return rec
     except Exception as e:
         raise Exception(f"In macro_recall, score cannot be computed. Detailed "
             + f"error: {repr(e)}")
 
 
+# Names of the scores computed for both tasks and batches, in output order
+_SCORE_NAMES = ("Accuracy", "Macro F1 Score", "Macro Precision", 
+    "Macro Recall")
+
+
 def compute_all_scores(y_true: np.ndarray, 
                        y_pred: np.ndarray,
                        num_ways: int,
@@ -340,24 +644,22 @@ def compute_all_scores(y_true: np.ndarray,
         batch (bool): Boolean flag to indicate that the current data belongs to 
             a batch instead of a task. Defaults to False.
 
+    Raises:
+        Exception: Exception raised when the scores cannot be computed.
+
     Returns:
         dict: Dictionary with all the scores.
     """
-    scoring = {
-        "Normalized Accuracy": normalized_accuracy,
-        "Accuracy": accuracy,
-        "Macro F1 Score": macro_f1_score,
-        "Macro Precision": macro_precision,
-        "Macro Recall": macro_recall
-    }
-    if batch:
-        del scoring["Normalized Accuracy"]
-        
     scores = dict()
-    for key in scoring.keys():
-        scoring_function = scoring[key]
-        if key == "Normalized Accuracy":
-            scores[key] = scoring_function(y_true, y_pred, num_ways)
-        else:
-            scores[key] = scoring_function(y_true, y_pred)
+    try:
+        y_pred_labels = _predicted_labels(y_pred)
+        acc, prec, rec, f1 = _scores_from_labels(y_true, y_pred_labels)
+        if not batch:
+            base_bac = 1/num_ways # random guessing
+            scores["Normalized Accuracy"] = (rec - base_bac) / (1 - base_bac)
+    except Exception as e:
+        raise Exception(f"In compute_all_scores, scores cannot be computed. "
+            + f"Detailed error: {repr(e)}")
+    
+    scores.update(zip(_SCORE_NAMES, (acc, f1, prec, rec)))
     return scores
@@ -1,6 +1,20 @@
 import os
+import zlib
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
 from contextlib import closing
-from zipfile import ZipFile, ZIP_DEFLATED
+from zipfile import ZipFile, ZipInfo, ZIP_DEFLATED
+from typing import Deque, Iterator, Tuple
+
+
+# zipdir compresses the files of up to _POOL_MAX_FILE_SIZE bytes in a process 
+# pool, larger files are streamed. The pool is only started when these files 
+# add up to more than _POOL_MIN_TOTAL_SIZE bytes, since starting it costs more
+# than compressing a few small files. At most _POOL_MAX_PENDING_SIZE bytes of 
+# data are being compressed at any time
+_POOL_MAX_FILE_SIZE = 4 * 2**20
+_POOL_MIN_TOTAL_SIZE = 32 * 2**20
+_POOL_MAX_PENDING_SIZE = 64 * 2**20
 
 
 def display(path_to_file: str) -> None:
@@ -14,25 +28,143 @@ def display(path_to_file: str) -> None:
         print("".join(f.readlines()))
         
         
+def _walk_files(basedir: str) -> Iterator[str]:
+    """ Recursively yield the paths of the files to be zipped, skipping zip 
+    files.
+
+    Args:
+        basedir (str): Directory to be traversed.
+
+    Yields:
+        Iterator[str]: Path of each file found.
+    """
+    with os.scandir(basedir) as entries:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                yield from _walk_files(entry.path)
+            elif entry.is_file() and not entry.name.endswith(".zip"):
+                yield entry.path
+
+
+def _deflate(path: str, 
+             compresslevel: int) -> Tuple[bytes, int, int]:
+    """ Compress a file into a raw DEFLATE stream, as stored in zip archives.
+
+    Args:
+        path (str): Path to the file to be compressed.
+        compresslevel (int): DEFLATE compression level, from 0 to 9.
+
+    Returns:
+        Tuple[bytes, int, int]: Compressed data, size of the original data and
+            CRC-32 of the original data.
+    """
+    with open(path, "rb") as f:
+        data = f.read()
+    compressor = zlib.compressobj(compresslevel, zlib.DEFLATED, -15)
+    blob = compressor.compress(data) + compressor.flush()
+    return blob, len(data), zlib.crc32(data)
+
+
+def _write_deflated(z: ZipFile, 
+                    zinfo: ZipInfo, 
+                    blob: bytes, 
+                    file_size: int, 
+                    crc: int) -> None:
+    """ Append an already compressed member to a zip archive. ZipFile has no 
+    public API for this, so the bookkeeping of ZipFile.write is reproduced.
+
+    Args:
+        z (ZipFile): Archive opened in write mode.
+        zinfo (ZipInfo): Information of the member to be written.
+        blob (bytes): Raw DEFLATE stream of the member.
+        file_size (int): Size of the uncompressed member.
+        crc (int): CRC-32 of the uncompressed member.
+    """
+    zinfo.compress_type = ZIP_DEFLATED
+    zinfo.file_size = file_size
+    zinfo.compress_size = len(blob)
+    zinfo.CRC = crc
+    with z._lock:
+        if z._writing:
+            raise ValueError("Can't write to the ZIP file while there is "
+                + "another write handle open on it")
+        z._writecheck(zinfo)
+        z.fp.seek(z.start_dir)
+        zinfo.header_offset = z.fp.tell()
+        z.fp.write(zinfo.FileHeader())
+        z.fp.write(blob)
+        z.start_dir = z.fp.tell()
+        z.filelist.append(zinfo)
+        z.NameToInfo[zinfo.filename] = zinfo
+
+
+def _write_pending(z: ZipFile, 
+                   basedir: str, 
+                   pending: Deque[Tuple[str, int, Future]],
+                   max_jobs: int = 0,
+                   max_size: int = 0) -> None:
+    """ Wait for the oldest files compressed by _deflate and append them to a 
+    zip archive, until no more than max_jobs files and max_size bytes are 
+    pending.
+
+    Args:
+        z (ZipFile): Archive opened in write mode.
+        basedir (str): Directory where the submission code is located.
+        pending (Deque[Tuple[str, int, Future]]): Path, size and pending result
+            of _deflate for each file, in submission order.
+        max_jobs (int, optional): Number of files that can remain pending. 
+            Defaults to 0.
+        max_size (int, optional): Number of bytes that can remain pending. 
+            Defaults to 0.
+    """
+    pending_size = sum(size for _, size, _ in pending)
+    while pending and (len(pending) > max_jobs or pending_size > max_size):
+        absfn, size, future = pending.popleft()
+        pending_size -= size
+        blob, file_size, crc = future.result()
+        zinfo = ZipInfo.from_file(absfn, os.path.relpath(absfn, basedir))
+        _write_deflated(z, zinfo, blob, file_size, crc)
+
+
 def zipdir(archivename: str, 
-           basedir: str) -> None:
+           basedir: str,
+           compresslevel: int = 1) -> None:
     """ Zip directory, from J.F. Sebastian http://stackoverflow.com/
 
     Args:
         archivename (str): Name for the zip file.
         basedir (str): Directory where the submission code is located.
+        compresslevel (int, optional): DEFLATE compression level, from 0 to 9.
+            Model weights barely compress, so a low level is much faster for 
+            almost the same archive size. Defaults to 1.
     """
     assert os.path.isdir(basedir)
-    with closing(ZipFile(archivename, "w", ZIP_DEFLATED)) as z:
-        for root, _, files in os.walk(basedir):
-            for fn in files:
-                if not fn.endswith(".zip"):
-                    absfn = os.path.join(root, fn)
-                    zfn = absfn[len(basedir):] 
-                    assert absfn[:len(basedir)] == basedir
-                    if zfn[0] == os.sep:
-                        zfn = zfn[1:]
-                    z.write(absfn, zfn)
+    files = [(absfn, os.path.getsize(absfn)) for absfn in 
+        _walk_files(basedir)]
+    small_sizes = [size for _, size in files if size <= _POOL_MAX_FILE_SIZE]
+    
+    with closing(ZipFile(archivename, "w", ZIP_DEFLATED, 
+            compresslevel=compresslevel)) as z:
+        if sum(small_sizes) <= _POOL_MIN_TOTAL_SIZE:
+            for absfn, _ in files:
+                z.write(absfn, os.path.relpath(absfn, basedir))
+            return
+        
+        # Small files are compressed in parallel and large files are streamed.
+        # Members are written in traversal order
+        workers = min(os.cpu_count() or 1, len(small_sizes))
+        with ProcessPoolExecutor(workers) as pool:
+            pending = deque()
+            for absfn, size in files:
+                if size > _POOL_MAX_FILE_SIZE:
+                    _write_pending(z, basedir, pending)
+                    z.write(absfn, os.path.relpath(absfn, basedir))
+                    continue
+                pending.append((absfn, size, pool.submit(_deflate, absfn, 
+                    compresslevel)))
+                _write_pending(z, basedir, pending, 2 * workers, 
+                    _POOL_MAX_PENDING_SIZE)
+            _write_pending(z, basedir, pending)
                
                     
 def download_public_data():
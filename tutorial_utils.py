@@ -1,8 +1,6 @@
 import os
 from sys import exit
 from collections import Counter
-from contextlib import closing
-from zipfile import ZipFile, ZIP_DEFLATED
 import numpy as np
 import matplotlib.pyplot as plt
 import torch
@@ -11,6 +9,7 @@ from cdmetadl.helpers.ingestion_helpers import cycle
 from cdmetadl.helpers.general_helpers import prepare_datasets_information
 from cdmetadl.ingestion.image_dataset import create_datasets, ImageDataset
 from cdmetadl.ingestion.data_generator import CompetitionDataLoader
+from main_utils import zipdir
 from typing import Iterator, Any, Tuple
 
 
@@ -25,27 +24,6 @@ def display(path_to_file: str) -> None:
         print("".join(f.readlines()))
 
 
-def zipdir(archivename: str, 
-           basedir: str) -> None:
-    """ Zip directory, from J.F. Sebastian http://stackoverflow.com/
-
-    Args:
-        archivename (str): Name for the zip file.
-        basedir (str): Directory where the submission code is located.
-    """
-    assert os.path.isdir(basedir)
-    with closing(ZipFile(archivename, "w", ZIP_DEFLATED)) as z:
-        for root, _, files in os.walk(basedir):
-            for fn in files:
-                if not fn.endswith(".zip"):
-                    absfn = os.path.join(root, fn)
-                    zfn = absfn[len(basedir):] 
-                    assert absfn[:len(basedir)] == basedir
-                    if zfn[0] == os.sep:
-                        zfn = zfn[1:]
-                    z.write(absfn, zfn)
-                            
-        
 def print_generator_info(generator: Iterator[Any], 
                          num_classes: int = None) -> None:
     """ Prints the information of a data generator.